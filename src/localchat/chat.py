@@ -1,14 +1,39 @@
 """Chat engine with tool calling support."""
 
+import hashlib
 import json
 import re
+import sqlite3
+import threading
 import time
-import os
 import sys
-import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Any, Optional, Protocol, runtime_checkable
+from typing import Any, Callable, Optional, Protocol, runtime_checkable
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None  # type: ignore
+
+# orjson is a C-implemented JSON codec, noticeably faster than stdlib on
+# the per-tool-call parse/serialize hot paths; fall back to stdlib json.
+try:
+    import orjson
+
+    def _loads(data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
 
 # from llama_cpp import Llama  # Removed to avoid runtime dependency
 
@@ -25,10 +50,50 @@ class LlamaModelProtocol(Protocol):
     ) -> dict[str, Any] | Any:
         ...
 
-from localchat.tools import ToolExecutor, TOOL_DEFINITIONS
+from localchat.tools import ToolExecutor, get_tool_prompt_fragment
+
+
+# Pattern for tool_call blocks in model output, compiled once: the parser
+# runs on every assistant turn (up to 10 per user message in tool loops).
+_TOOL_CALL_RE = re.compile(r'```tool_call\s*\n?(.*?)\n?```', re.DOTALL)
 
+# Opening marker of a tool_call block, shared by the parser fast path and
+# the streaming suppression logic.
+_MARKER = "```tool_call"
 
-@dataclass
+
+# The tool list is rendered once in localchat.tools, next to the
+# definitions; the base prompt is built once at import. Keeping the text
+# byte-identical across engines also lets llama.cpp reuse its
+# prompt-prefix KV cache.
+_TOOLS_TEXT = get_tool_prompt_fragment()
+
+_BASE_PROMPT = f"""You are a helpful assistant with access to the following tools:
+
+{_TOOLS_TEXT}
+
+To use a tool, respond with a JSON object in this exact format:
+```tool_call
+{{"name": "tool_name", "arguments": {{"param1": "value1", "param2": "value2"}}}}
+```
+
+You can make multiple tool calls by including multiple tool_call blocks.
+After receiving tool results, provide your final response to the user.
+Only use tools when necessary to complete the user's request."""
+
+# Template for tool results fed back to the model. A module-level
+# constant so the rendered history is byte-identical across turns and
+# engines: llama.cpp's KV cache reuses the longest matching prompt
+# prefix, and any formatting drift (timestamps, reordered fields) would
+# invalidate it back to the start of the drift.
+_TOOL_RESULT_TEMPLATE = "Tool result for {tool}:\n{content}"
+
+# REPL commands, precomputed so the per-turn dispatch is a frozenset
+# membership test on an already-lowercased string.
+_EXIT_COMMANDS = frozenset({"quit", "exit"})
+
+
+@dataclass(slots=True)
 class ToolCall:
     """Represents a tool call from the model."""
     name: str
@@ -48,24 +113,31 @@ class ToolCall:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A message in the conversation."""
     role: str  # "user", "assistant", "tool"
     content: str
     tool_calls: list[ToolCall] = field(default_factory=list)
     tool_call_id: Optional[str] = None  # For tool result messages
+    # Memoized to_dict result. Messages are never mutated once appended
+    # to history, but to_dict runs per message on every save/signature.
+    _cached_dict: Optional[dict] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def to_dict(self) -> dict[str, Any]:
-        data = {
-            "role": self.role,
-            "content": self.content,
-        }
-        if self.tool_calls:
-            data["tool_calls"] = [tc.to_dict() for tc in self.tool_calls]
-        if self.tool_call_id:
-            data["tool_call_id"] = self.tool_call_id
-        return data
+        if self._cached_dict is None:
+            data = {
+                "role": self.role,
+                "content": self.content,
+            }
+            if self.tool_calls:
+                data["tool_calls"] = [tc.to_dict() for tc in self.tool_calls]
+            if self.tool_call_id:
+                data["tool_call_id"] = self.tool_call_id
+            self._cached_dict = data
+        return self._cached_dict
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "Message":
@@ -81,7 +153,7 @@ class Message:
         )
 
 
-@dataclass 
+@dataclass(slots=True)
 class GenerationStats:
     """Statistics for a generation."""
     total_tokens: int
@@ -95,6 +167,173 @@ class GenerationStats:
             return self.completion_tokens / self.duration_seconds
         return 0.0
 
+    def __iadd__(self, other: "GenerationStats") -> "GenerationStats":
+        self.total_tokens += other.total_tokens
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.duration_seconds += other.duration_seconds
+        return self
+
+
+class LLMResponseCache:
+    """
+    Exact-match cache for model responses, backed by SQLite.
+
+    Identical conversation states (same messages, temperature, and
+    max_tokens) are the dominant repeated cost in tests and tool loops,
+    so a hit replaces a full generation with a single database lookup.
+    Entries are only written for deterministic sampling (temperature 0)
+    unless the caller opts in, to avoid caching stochastic outputs.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+                     (default: ~/.localchat/llm_cache.db)
+        """
+        if db_path is None:
+            db_path = Path.home() / ".localchat" / "llm_cache.db"
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, "
+            "response TEXT NOT NULL, "
+            "completion_tokens INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(messages: list[dict], temperature: float, max_tokens: int) -> str:
+        """Build a deterministic cache key from the full generation request."""
+        payload = json.dumps(
+            {"m": messages, "t": temperature, "n": max_tokens},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple[str, int]]:
+        """Look up a cached (response_text, completion_tokens) pair."""
+        row = self._conn.execute(
+            "SELECT response, completion_tokens FROM llm_cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1]
+
+    def put(self, key: str, response: str, completion_tokens: int) -> None:
+        """Store a response under the given key."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, response, completion_tokens) "
+            "VALUES (?, ?, ?)",
+            (key, response, completion_tokens),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+
+class SemanticCache:
+    """
+    Opt-in semantic cache over user turns.
+
+    Embeds each user input with a caller-supplied local embedder and
+    returns a previously generated response when a new input is a close
+    paraphrase (cosine similarity >= threshold) of a cached one. Entries
+    are scoped by a hash of the preceding conversation history so a hit
+    can never leak a response from a different conversation state.
+
+    Uses numpy for the similarity sweep when available, falling back to
+    a pure-Python dot product otherwise.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], list[float]],
+        threshold: float = 0.95,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embed_fn: Function mapping text to an embedding vector
+                      (e.g. a llama.cpp embedding model)
+            threshold: Minimum cosine similarity for a cache hit
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        # Parallel lists: normalized embeddings and (response, history_hash)
+        self._embeddings: list[Any] = []
+        self._entries: list[tuple[str, str]] = []
+        # Exact-match fast path: repeated literal inputs ("help", "list
+        # files") hit a dict lookup without paying for an embedding.
+        self._exact: dict[bytes, str] = {}
+
+    @staticmethod
+    def _exact_key(text: str, history_hash: str) -> bytes:
+        """Digest of the normalized input scoped to the history state."""
+        return hashlib.blake2b(
+            (text.lower().strip() + "\x00" + history_hash).encode("utf-8"),
+            digest_size=16,
+        ).digest()
+
+    @staticmethod
+    def _normalize(vector: Any) -> Any:
+        """Normalize a vector to unit length (so dot product == cosine)."""
+        if NUMPY_AVAILABLE:
+            arr = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(arr))
+            return arr / norm if norm > 0 else arr
+        norm = sum(x * x for x in vector) ** 0.5
+        if norm == 0:
+            return list(vector)
+        return [x / norm for x in vector]
+
+    def lookup(self, text: str, history_hash: str) -> Optional[str]:
+        """Return a cached response for a semantically similar input, if any."""
+        if not self._entries:
+            return None
+
+        exact = self._exact.get(self._exact_key(text, history_hash))
+        if exact is not None:
+            return exact
+
+        query = self._normalize(self.embed_fn(text))
+
+        best_sim = -1.0
+        best_idx = -1
+        if NUMPY_AVAILABLE:
+            sims = np.stack(self._embeddings) @ query
+            for i, (_, entry_hash) in enumerate(self._entries):
+                if entry_hash == history_hash and sims[i] > best_sim:
+                    best_sim = float(sims[i])
+                    best_idx = i
+        else:
+            for i, (_, entry_hash) in enumerate(self._entries):
+                if entry_hash != history_hash:
+                    continue
+                sim = sum(a * b for a, b in zip(self._embeddings[i], query))
+                if sim > best_sim:
+                    best_sim = sim
+                    best_idx = i
+
+        if best_idx >= 0 and best_sim >= self.threshold:
+            return self._entries[best_idx][0]
+        return None
+
+    def add(self, text: str, response: str, history_hash: str) -> None:
+        """Store a response keyed by the input's embedding and history state."""
+        self._embeddings.append(self._normalize(self.embed_fn(text)))
+        self._entries.append((response, history_hash))
+        self._exact[self._exact_key(text, history_hash)] = response
+
 
 class ChatEngine:
     """
@@ -115,115 +354,310 @@ class ChatEngine:
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2048,
+        response_cache: Optional[LLMResponseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        max_tool_result_chars: int = 8000,
+        max_history_messages: Optional[int] = None,
+        history_archive: Optional[Path] = None,
+        max_context_messages: Optional[int] = None,
+        sink_messages: int = 2,
     ):
         """
         Initialize the chat engine.
-        
+
         Args:
             model: The loaded Llama model (conforming to LlamaModelProtocol)
             tool_executor: Tool executor for handling tool calls
             system_prompt: Optional system prompt
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            response_cache: Optional exact-match response cache; only
+                consulted when temperature == 0 (deterministic sampling)
+            semantic_cache: Optional paraphrase-level cache over user turns
+            max_tool_result_chars: Cap on tool output stored in history;
+                larger results keep their head and tail so huge file reads
+                don't inflate every subsequent prompt
+            max_history_messages: If set, keep at most this many messages
+                in memory; older messages are evicted between turns so the
+                prompt (and its eval cost) stays bounded
+            history_archive: Optional JSONL file that evicted messages are
+                appended to, so long sessions lose no data
+            max_context_messages: If set, cap how many history messages
+                are sent to the model per generation. Unlike
+                max_history_messages this is non-destructive: the full
+                history stays in memory, but the prompt keeps only the
+                first sink_messages plus the most recent tail
+                (StreamingLLM-style attention sinks), so prefill cost
+                stays flat however long the session runs
+            sink_messages: How many of the earliest messages to always
+                keep in the prompt when truncating
         """
         self.model = model
         self.tool_executor = tool_executor
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.max_tool_result_chars = max_tool_result_chars
+        self.max_history_messages = max_history_messages
+        self.history_archive = history_archive
+        self.max_context_messages = max_context_messages
+        self.sink_messages = sink_messages
         
         # Initialize conversation history
         self.history: list[Message] = []
-        
+
         # Set up system prompt with tool information
         self.system_prompt = self._build_system_prompt(system_prompt)
-    
-    def _build_system_prompt(self, user_system_prompt: Optional[str]) -> str:
-        """Build the system prompt including tool definitions."""
-        tool_descriptions = []
-        for tool_def in TOOL_DEFINITIONS:
-            func = tool_def["function"]
-            params = func["parameters"]["properties"]
-            param_strs = []
-            for name, info in params.items():
-                param_strs.append(f'{name}: {info["type"]}')
-            tool_descriptions.append(
-                f"- {func['name']}({', '.join(param_strs)}): {func['description']}"
-            )
-        
-        tools_text = "\n".join(tool_descriptions)
-        
-        base_prompt = f"""You are a helpful assistant with access to the following tools:
 
-{tools_text}
+        # Incrementally built model-format message list: history is
+        # append-only between resets, so each generation only needs to
+        # transform the messages added since the last build instead of
+        # rebuilding O(history) dicts per turn.
+        self._msg_cache: list[dict] = [
+            {"role": "system", "content": self.system_prompt}
+        ]
+        self._msg_cache_len = 0
 
-To use a tool, respond with a JSON object in this exact format:
-```tool_call
-{{"name": "tool_name", "arguments": {{"param1": "value1", "param2": "value2"}}}}
-```
+        # Serializes model access: a speculative prefill may still be
+        # running on a background thread when the next turn starts.
+        self._model_lock = threading.Lock()
 
-You can make multiple tool calls by including multiple tool_call blocks.
-After receiving tool results, provide your final response to the user.
-Only use tools when necessary to complete the user's request."""
+        # Per-turn (duration_seconds, completion_tokens) log, reduced by
+        # summarize_session(); kept as plain pairs so the reduction can
+        # vectorize when numpy is available.
+        self._turn_log: list[tuple[float, int]] = []
 
+    def _build_system_prompt(self, user_system_prompt: Optional[str]) -> str:
+        """Build the system prompt including tool definitions."""
         if user_system_prompt:
-            return f"{base_prompt}\n\n{user_system_prompt}"
-        return base_prompt
+            return f"{_BASE_PROMPT}\n\n{user_system_prompt}"
+        return _BASE_PROMPT
     
+    def _truncate_tool_result(self, result: str) -> str:
+        """Cap a tool result to max_tool_result_chars, keeping head and tail."""
+        limit = self.max_tool_result_chars
+        if limit <= 0 or len(result) <= limit:
+            return result
+        head = limit * 3 // 4
+        tail = limit - head
+        omitted = len(result) - head - tail
+        return (
+            f"{result[:head]}\n"
+            f"... [{omitted} characters truncated] ...\n"
+            f"{result[-tail:]}"
+        )
+
+    def _prune_history(self) -> None:
+        """
+        Evict the oldest messages once history exceeds the configured cap.
+
+        The eviction boundary is advanced past any tool results it would
+        split off, so a result is never kept after the assistant message
+        that invoked it was archived. Evicted messages are appended to
+        the history archive, if one is configured.
+        """
+        limit = self.max_history_messages
+        if limit is None or len(self.history) <= limit:
+            return
+
+        # Mutating history and the message cache must not interleave
+        # with a background prefill's incremental cache build.
+        with self._model_lock:
+            cut = len(self.history) - limit
+            # Snap to a turn boundary: a kept window opening with tool
+            # results would orphan them from their archived tool call.
+            while cut < len(self.history) and self.history[cut].role == "tool":
+                cut += 1
+
+            evicted = self.history[:cut]
+            self.history = self.history[cut:]
+            self._reset_msg_cache()
+
+        if self.history_archive is not None:
+            try:
+                with self.history_archive.open("a", encoding="utf-8") as f:
+                    for msg in evicted:
+                        f.write(_dumps(msg.to_dict()))
+                        f.write("\n")
+            except OSError as e:
+                print(f"Warning: Failed to archive history: {e}", file=sys.stderr)
+
+    def _history_signature(self) -> str:
+        """Hash the current history (for scoping semantic cache entries)."""
+        payload = json.dumps(
+            [msg.to_dict() for msg in self.history], sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def _build_messages_for_model(self) -> list[dict]:
-        """Convert history to format expected by llama-cpp-python."""
-        messages = [{"role": "system", "content": self.system_prompt}]
-        
-        for msg in self.history:
+        """Convert history to format expected by llama-cpp-python.
+
+        Callers must hold the model lock: the build is incremental and
+        races with history mutations otherwise.
+        """
+        # Only transform the messages appended since the last build. The
+        # slice is taken once and the cached length advanced by its size,
+        # so a concurrent append can never be marked cached without
+        # actually entering the cache.
+        new = self.history[self._msg_cache_len:]
+        for msg in new:
             if msg.role == "tool":
                 # Format tool results as assistant context
-                messages.append({
+                self._msg_cache.append({
                     "role": "user",
-                    "content": f"Tool result for {msg.tool_call_id}:\n{msg.content}"
+                    "content": _TOOL_RESULT_TEMPLATE.format(
+                        tool=msg.tool_call_id, content=msg.content
+                    )
                 })
             else:
-                messages.append({
+                self._msg_cache.append({
                     "role": msg.role,
                     "content": msg.content
                 })
-        
-        return messages
+        self._msg_cache_len += len(new)
+
+        # Sliding-window truncation: keep the system prompt, the first
+        # few "sink" messages, and the most recent tail. Built by slicing
+        # the (still complete) incremental cache, so the cache itself
+        # never needs invalidating as the window moves.
+        if (
+            self.max_context_messages is not None
+            and self._msg_cache_len > self.max_context_messages
+        ):
+            sink = min(self.sink_messages, self.max_context_messages)
+            recent = self.max_context_messages - sink
+            windowed = self._msg_cache[: 1 + sink]
+            if recent:
+                windowed += self._msg_cache[len(self._msg_cache) - recent:]
+            return windowed
+
+        # Shallow copy so callers can't mutate the cached list
+        return list(self._msg_cache)
+
+    def _reset_msg_cache(self) -> None:
+        """Invalidate the incrementally built message list."""
+        self._msg_cache = [{"role": "system", "content": self.system_prompt}]
+        self._msg_cache_len = 0
+
+    def _append_history(self, *messages: Message) -> None:
+        """Append to history under the model lock.
+
+        A background prefill may be extending the message cache from
+        history; unlocked appends could be marked cached without ever
+        entering the cache and vanish from all later prompts.
+        """
+        with self._model_lock:
+            self.history.extend(messages)
     
-    def _parse_tool_calls(self, response_text: str) -> tuple[list[ToolCall], str]:
+    def _parse_tool_calls(
+        self, response_text: str | bytes
+    ) -> tuple[list[ToolCall], str]:
         """
         Parse tool calls from model response.
-        
+
+        Accepts bytes (some llama-cpp-python builds yield raw UTF-8) and
+        decodes exactly once up front; scanning then stays on str.
+
         Returns:
             Tuple of (list of tool calls, remaining text)
         """
+        if isinstance(response_text, bytes):
+            response_text = response_text.decode("utf-8", "replace")
+        # Fast path: most responses (every final answer) contain no tool
+        # blocks, and a C-level substring check is far cheaper than the
+        # regex scan.
+        if _MARKER not in response_text:
+            return [], response_text.strip()
+
         tool_calls = []
-        
-        # Pattern to match tool_call blocks
-        pattern = r'```tool_call\s*\n?(.*?)\n?```'
-        matches = re.findall(pattern, response_text, re.DOTALL)
-        
-        for match in matches:
+
+        # Single pass: collect tool calls and splice out their blocks at
+        # the same time, instead of a findall scan followed by a sub scan.
+        parts = []
+        last = 0
+        for match in _TOOL_CALL_RE.finditer(response_text):
+            parts.append(response_text[last:match.start()])
+            last = match.end()
+            block = match.group(1).strip()
+            # Obvious non-JSON (prose in a mislabeled fence) skips the
+            # parser — and its exception — outright.
+            if not block.startswith("{"):
+                continue
             try:
-                data = json.loads(match.strip())
-                if "name" in data and "arguments" in data:
-                    tool_calls.append(ToolCall(
-                        name=data["name"],
-                        arguments=data["arguments"]
-                    ))
-            except json.JSONDecodeError:
+                data = _loads(block)
+            except ValueError:
                 # Skip invalid JSON
                 continue
-        
-        # Remove tool_call blocks from response
-        clean_text = re.sub(pattern, '', response_text, flags=re.DOTALL).strip()
-        
+            if "name" in data and "arguments" in data:
+                tool_calls.append(ToolCall(
+                    name=data["name"],
+                    arguments=data["arguments"]
+                ))
+        parts.append(response_text[last:])
+
+        clean_text = "".join(parts).strip()
+
         return tool_calls, clean_text
     
+    def prefill(self) -> None:
+        """
+        Warm the model's KV cache for the current conversation state.
+
+        Runs the prompt through the model with a one-token generation so
+        llama.cpp caches the prefix KV. Meant to be called on a
+        background thread between turns (while the user is typing): the
+        next real generation then starts from a warm cache and pays
+        almost nothing for prefill. Purely opportunistic — errors are
+        swallowed and a concurrent generation simply waits on the lock.
+        """
+        try:
+            with self._model_lock:
+                self.model.create_chat_completion(
+                    messages=self._build_messages_for_model(),
+                    temperature=self.temperature,
+                    max_tokens=1,
+                    stream=False,
+                )
+        except Exception:
+            pass
+
     def _generate_response(self) -> tuple[str, GenerationStats]:
         """Generate a response from the model, optionally streaming it."""
+        with self._model_lock:
+            return self._generate_response_locked()
+
+    def _generate_response_locked(self) -> tuple[str, GenerationStats]:
+        """Generate a response; caller must hold the model lock."""
         messages = self._build_messages_for_model()
-        
-        start_time = time.time()
-        
+
+        # Exact-match cache: only for deterministic sampling so we never
+        # replay a stochastic output. The key covers the full message list
+        # (including the system prompt) plus the sampling parameters.
+        cache_key = None
+        if self.response_cache is not None and self.temperature == 0:
+            cache_key = LLMResponseCache.make_key(
+                messages, self.temperature, self.max_tokens
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                cached_text, cached_tokens = cached
+                print(cached_text, end="", flush=True)
+                return cached_text, GenerationStats(
+                    total_tokens=cached_tokens,
+                    prompt_tokens=0,
+                    completion_tokens=cached_tokens,
+                    duration_seconds=0.0,
+                )
+
+        # Monotonic, nanosecond-resolution clock: time.time() can jump on
+        # wall-clock adjustments and has coarser resolution.
+        start_ns = time.perf_counter_ns()
+
+        # Streamed content is accumulated in a list and joined once at the
+        # end: repeated str concatenation would copy the growing text on
+        # every chunk (O(n^2) over long generations).
+        full_parts: list[str] = []
         full_text = ""
         completion_tokens = 0
         prompt_tokens = 0
@@ -232,7 +666,36 @@ Only use tools when necessary to complete the user's request."""
         # Buffer for tool call detection
         buffer = ""
         in_tool_call_block = False
-        
+        fence_search_from = len(_MARKER)
+
+        # Per-token print(..., flush=True) costs a write + flush syscall
+        # per chunk; batch writes and flush at most every 25ms instead.
+        # Where stdout exposes its raw buffer, write pre-encoded UTF-8
+        # bytes directly, skipping the text layer's per-write encoding,
+        # locking and newline translation; otherwise (replaced or
+        # wrapped stdout) fall back to text-mode writes.
+        stdout = sys.stdout
+        raw = getattr(stdout, "buffer", None)
+        if raw is not None:
+            stdout.flush()  # order any pending text-layer output first
+            _write_raw = raw.write
+            _flush = raw.flush
+
+            def _write(text: str) -> None:
+                _write_raw(text.encode("utf-8"))
+        else:
+            _write = stdout.write
+            _flush = stdout.flush
+        last_flush = time.monotonic()
+
+        def emit(text: str) -> None:
+            nonlocal last_flush
+            _write(text)
+            now = time.monotonic()
+            if now - last_flush > 0.025:
+                _flush()
+                last_flush = now
+
         try:
             # Try to stream first
             response_iter = self.model.create_chat_completion(
@@ -252,16 +715,21 @@ Only use tools when necessary to complete the user's request."""
                  full_text = response["choices"][0]["message"]["content"] or ""
                  usage = response.get("usage", {})
                  print(full_text, end="", flush=True) # Emulate stream
-                 
-                 return full_text, GenerationStats(
+
+                 stats = GenerationStats(
                     total_tokens=usage.get("total_tokens", 0),
                     prompt_tokens=usage.get("prompt_tokens", 0),
                     completion_tokens=usage.get("completion_tokens", 0),
-                    duration_seconds=time.time() - start_time,
+                    duration_seconds=(time.perf_counter_ns() - start_ns) / 1e9,
                  )
+                 if cache_key is not None:
+                     self.response_cache.put(
+                         cache_key, full_text, stats.completion_tokens
+                     )
+                 return full_text, stats
+
+            marker = _MARKER
 
-            marker = "```tool_call"
-            
             for chunk in response_iter:
                 if not isinstance(chunk, dict):
                     continue
@@ -271,14 +739,23 @@ Only use tools when necessary to complete the user's request."""
                 
                 if content:
                     completion_tokens += 1
-                    full_text += content
+                    full_parts.append(content)
                     buffer += content
                     
                     if in_tool_call_block:
-                         # We are in tool block, suppress output
-                         # We could check for end of block here if we wanted to resume printing
-                         # But per design, we suppress everything after tool call starts
-                         pass
+                         # We are in tool block, suppress output.
+                         # Once the closing fence arrives the block is
+                         # complete, so stop decoding and let the tool run
+                         # instead of waiting for the model to finish.
+                         # Resume the fence search where the last one gave
+                         # up (re-checking 2 chars for a fence split across
+                         # chunks) so each token scans O(chunk), not
+                         # O(block), text.
+                         if buffer.find("```", fence_search_from) != -1:
+                             break
+                         fence_search_from = max(
+                             fence_search_from, len(buffer) - 2
+                         )
                     else:
                         # Check if we found the marker
                         if marker in buffer:
@@ -287,30 +764,30 @@ Only use tools when necessary to complete the user's request."""
                             split_index = buffer.find(marker)
                             to_print = buffer[:split_index]
                             if to_print:
-                                print(to_print, end="", flush=True)
+                                emit(to_print)
                             buffer = buffer[split_index:] # Keep rest in buffer (suppressed)
+                            fence_search_from = len(marker)
                         else:
-                            # Check for partial marker at the end
-                            possible_match_len = 0
-                            # Check suffixes of buffer
-                            # Optimization: only check suffixes up to len(marker) - 1
-                            # and start checking from longest potential match
-                            max_check = min(len(buffer), len(marker) - 1)
-                            for i in range(max_check, 0, -1):
-                                suffix = buffer[-i:]
-                                if marker.startswith(suffix):
-                                    possible_match_len = i
-                                    break
-                            
+                            # Check for a partial marker at the end: only
+                            # the last len(marker)-1 chars can start one,
+                            # so locate candidate start positions with
+                            # C-level find instead of slicing and
+                            # comparing every suffix length per token.
+                            tail_start = max(0, len(buffer) - len(marker) + 1)
+                            idx = buffer.find(marker[0], tail_start)
+                            while idx != -1 and not marker.startswith(buffer[idx:]):
+                                idx = buffer.find(marker[0], idx + 1)
+                            possible_match_len = len(buffer) - idx if idx != -1 else 0
+
                             if possible_match_len > 0:
                                 # Printable part is everything except the suffix
                                 to_print = buffer[:-possible_match_len]
                                 if to_print:
-                                    print(to_print, end="", flush=True)
+                                    emit(to_print)
                                 buffer = buffer[-possible_match_len:] # Keep the partial match for next iteration
                             else:
                                 # No partial match, safe to print all
-                                print(buffer, end="", flush=True)
+                                emit(buffer)
                                 buffer = ""
         
         except TypeError:
@@ -320,6 +797,7 @@ Only use tools when necessary to complete the user's request."""
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
             )
+            full_parts = []
             full_text = response["choices"][0]["message"]["content"]
             usage = response.get("usage", {})
             prompt_tokens = usage.get("prompt_tokens", 0)
@@ -327,15 +805,20 @@ Only use tools when necessary to complete the user's request."""
             total_tokens = usage.get("total_tokens", 0)
             print(full_text, end="", flush=True) # Print all at once
 
-        duration = time.time() - start_time
+        # Make sure everything batched by emit() reaches the terminal
+        _flush()
+
+        if full_parts:
+            full_text = "".join(full_parts)
+
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
         
-        # If we didn't get usage from a direct dict API, estimate it
-        if total_tokens == 0:
-             # Very rough estimate
-             # We don't have prompt tokens easily available from stream chunks 
-             # (llama-cpp-python puts usage in the *last* chunk usually, but not guaranteed)
-             # Let's try to trust the stats return if possible, or just use length.
-             completion_tokens = len(full_text) // 4 
+        # If we didn't get usage from a direct dict API, estimate it —
+        # but only when the streaming loop didn't already count deltas;
+        # the per-chunk count is accurate and must not be overwritten.
+        if total_tokens == 0 and completion_tokens == 0:
+             # Rough byte heuristic (~3.5 bytes/token for BPE vocabs)
+             completion_tokens = max(1, int(len(full_text.encode("utf-8")) / 3.5))
              
         stats = GenerationStats(
             total_tokens=total_tokens,
@@ -343,7 +826,10 @@ Only use tools when necessary to complete the user's request."""
             completion_tokens=completion_tokens,
             duration_seconds=duration,
         )
-        
+
+        if cache_key is not None:
+            self.response_cache.put(cache_key, full_text, stats.completion_tokens)
+
         return full_text, stats
     
     def chat(self, user_input: str) -> tuple[str, GenerationStats]:
@@ -358,8 +844,30 @@ Only use tools when necessary to complete the user's request."""
         Returns:
             Tuple of (assistant response, generation stats)
         """
+        # Bound prompt growth before starting the new turn
+        self._prune_history()
+
+        # Semantic cache: check before touching the model. The key is
+        # scoped by the history that precedes this user turn.
+        history_hash = None
+        if self.semantic_cache is not None:
+            history_hash = self._history_signature()
+            cached_response = self.semantic_cache.lookup(user_input, history_hash)
+            if cached_response is not None:
+                print(cached_response, end="", flush=True)
+                self._append_history(
+                    Message(role="user", content=user_input),
+                    Message(role="assistant", content=cached_response),
+                )
+                return cached_response, GenerationStats(
+                    total_tokens=0,
+                    prompt_tokens=0,
+                    completion_tokens=0,
+                    duration_seconds=0.0,
+                )
+
         # Add user message to history
-        self.history.append(Message(role="user", content=user_input))
+        self._append_history(Message(role="user", content=user_input))
         
         total_stats = GenerationStats(
             total_tokens=0,
@@ -378,55 +886,140 @@ Only use tools when necessary to complete the user's request."""
             response_text, stats = self._generate_response()
             
             # Accumulate stats
-            total_stats.total_tokens += stats.total_tokens
-            total_stats.prompt_tokens += stats.prompt_tokens
-            total_stats.completion_tokens += stats.completion_tokens
-            total_stats.duration_seconds += stats.duration_seconds
+            total_stats += stats
             
             # Parse tool calls
             tool_calls, clean_text = self._parse_tool_calls(response_text)
             
             if not tool_calls:
                 # No tool calls, this is the final response
-                self.history.append(Message(role="assistant", content=response_text))
+                self._append_history(Message(role="assistant", content=response_text))
+                # Only cache turns that ran no tools: replaying a cached
+                # answer must never skip a tool's side effects.
+                if self.semantic_cache is not None and iteration == 1:
+                    self.semantic_cache.add(user_input, response_text, history_hash)
+                self._turn_log.append(
+                    (total_stats.duration_seconds, total_stats.completion_tokens)
+                )
                 return response_text, total_stats
             
             # Process tool calls
-            self.history.append(Message(
+            self._append_history(Message(
                 role="assistant",
                 content=response_text,
                 tool_calls=tool_calls
             ))
             
             for tool_call in tool_calls:
-                # Log the tool call
-                print(f"\n  TOOL CALL: {tool_call.name} {json.dumps(tool_call.arguments)}")
-                
-                # Execute the tool
-                result = self.tool_executor.execute(
-                    tool_call.name,
-                    tool_call.arguments
-                )
-                
+                # Log the tool calls up front
+                print(f"\n  TOOL CALL: {tool_call.name} {_dumps(tool_call.arguments)}")
+
+            # Execute the tools: concurrently when the model requested
+            # several in one turn (they are independent file/IO work, so
+            # wall-clock becomes max(t_i) instead of sum(t_i)). ex.map
+            # preserves the request order for the results.
+            if len(tool_calls) == 1:
+                results = [self.tool_executor.execute(
+                    tool_calls[0].name,
+                    tool_calls[0].arguments
+                )]
+            else:
+                with ThreadPoolExecutor(max_workers=min(8, len(tool_calls))) as ex:
+                    results = list(ex.map(
+                        lambda tc: self.tool_executor.execute(tc.name, tc.arguments),
+                        tool_calls
+                    ))
+
+            for tool_call, result in zip(tool_calls, results):
                 # Log the result (truncated)
-                result_preview = result[:200] + "..." if len(result) > 200 else result
-                print(f"  TOOL RESULT: {result_preview}")
-                
-                # Add tool result to history
-                self.history.append(Message(
+                preview = result if len(result) <= 200 else f"{result[:200]}..."
+                sys.stdout.write(f"  TOOL RESULT: {preview}\n")
+
+                # Add tool result to history, capped so one huge file read
+                # doesn't bloat every subsequent prompt
+                self._append_history(Message(
                     role="tool",
-                    content=result,
+                    content=self._truncate_tool_result(result),
                     tool_call_id=tool_call.name
                 ))
         
         # Max iterations reached
         final_response = "I apologize, but I was unable to complete the request within the allowed number of steps."
-        self.history.append(Message(role="assistant", content=final_response))
+        self._append_history(Message(role="assistant", content=final_response))
+        self._turn_log.append(
+            (total_stats.duration_seconds, total_stats.completion_tokens)
+        )
         return final_response, total_stats
+
+    def summarize_session(self) -> dict[str, float]:
+        """
+        Reduce the per-turn stats log into session totals.
+
+        Eval and benchmark runs can accumulate thousands of turns, so
+        the reduction goes through numpy when it's installed; the
+        pure-Python fallback computes the same figures.
+        """
+        if not self._turn_log:
+            return {
+                "turns": 0,
+                "total_completion_tokens": 0,
+                "total_seconds": 0.0,
+                "tokens_per_second": 0.0,
+            }
+        if NUMPY_AVAILABLE:
+            arr = np.asarray(self._turn_log, dtype=np.float64)
+            total_seconds = float(arr[:, 0].sum())
+            total_tokens = int(arr[:, 1].sum())
+        else:
+            total_seconds = 0.0
+            total_tokens = 0
+            for duration, tokens in self._turn_log:
+                total_seconds += duration
+                total_tokens += tokens
+        return {
+            "turns": len(self._turn_log),
+            "total_completion_tokens": total_tokens,
+            "total_seconds": total_seconds,
+            "tokens_per_second": (
+                total_tokens / total_seconds if total_seconds > 0 else 0.0
+            ),
+        }
     
+    def chat_batch(self, user_inputs: list[str]) -> list[tuple[str, GenerationStats]]:
+        """
+        Run several independent user inputs through the full tool loop.
+
+        Each input sees the conversation state as it was when chat_batch
+        was called; none of the batch turns leak into each other or into
+        the engine's history. Intended for scripted and evaluation runs
+        that drive the engine non-interactively. Inputs run sequentially:
+        a single llama.cpp context cannot decode two sequences at once,
+        but batching here still amortizes prompt-prefix KV reuse across
+        the batch.
+
+        Args:
+            user_inputs: Independent user messages to process
+
+        Returns:
+            List of (assistant response, generation stats), in input order
+        """
+        base_history = list(self.history)
+        results = []
+        try:
+            for user_input in user_inputs:
+                self.history = list(base_history)
+                self._reset_msg_cache()
+                results.append(self.chat(user_input))
+        finally:
+            self.history = list(base_history)
+            self._reset_msg_cache()
+        return results
+
     def clear_history(self) -> None:
         """Clear the conversation history."""
-        self.history.clear()
+        with self._model_lock:
+            self.history.clear()
+            self._reset_msg_cache()
 
     def get_history_as_dicts(self) -> list[dict[str, Any]]:
         """Return history as a list of dictionaries."""
@@ -435,6 +1028,7 @@ Only use tools when necessary to complete the user's request."""
     def load_history_from_dicts(self, history_data: list[dict[str, Any]]) -> None:
         """Load history from a list of dictionaries."""
         self.history = [Message.from_dict(msg_data) for msg_data in history_data]
+        self._reset_msg_cache()
 
 
 def run_repl(
@@ -464,12 +1058,17 @@ def run_repl(
         max_tokens=max_tokens,
     )
     
+    # Creation timestamp is written once per session, not re-stamped on
+    # every save; restored sessions keep their original value.
+    session_created_at: Optional[str] = None
+
     # Load session if provided
     if session_file and session_file.exists():
         try:
             print(f"Loading session from {session_file}...")
             content = session_file.read_text(encoding="utf-8")
-            data = json.loads(content)
+            data = _loads(content)
+            session_created_at = data.get("created_at")
             if "history" in data:
                 engine.load_history_from_dicts(data["history"])
                 print(f"Restored {len(engine.history)} messages.")
@@ -481,53 +1080,84 @@ def run_repl(
     print("\nLocalChat Ready! Type 'quit' or 'exit' to end the session.")
     print("Type 'clear' to clear conversation history.")
     print("-" * 50)
-    
-    while True:
+
+    # Session saves run on a single background worker so the prompt comes
+    # back right after each turn instead of blocking on disk I/O. The
+    # history snapshot is taken on the REPL thread; only serialization and
+    # the atomic write happen in the background.
+    # os and datetime are only needed on the session-save path; import
+    # them here so sessions without --session never pay for them at
+    # startup.
+    saver: Optional[ThreadPoolExecutor] = None
+    if session_file:
+        import datetime
+        import os
+        saver = ThreadPoolExecutor(max_workers=1)
+
+    def _save_session(data: dict[str, Any]) -> None:
         try:
-            # Get user input
-            user_input = input("\nYou: ").strip()
-            
-            if not user_input:
-                continue
-            
-            if user_input.lower() in ("quit", "exit"):
-                print("Goodbye!")
-                break
-            
-            if user_input.lower() == "clear":
-                engine.clear_history()
-                print("Conversation history cleared.")
-                continue
-            
-            # Get response
-            print("\nAssistant: ", end="", flush=True)
-            response, stats = engine.chat(user_input)
-            
-            # Print response (if not already printed during tool calls)
-            if response and False: # Disabled because chat() now streams to stdout
-                print(response)
-            
-            # Print stats
-            print(f"\n  [{stats.completion_tokens} tokens, {stats.tokens_per_second:.1f} tok/s, {stats.duration_seconds:.2f}s]")
-            
-            # Save session if configured
-            if session_file:
-                try:
+            # Atomic write
+            temp_file = session_file.with_suffix(session_file.suffix + ".tmp")
+            # _dumps routes through orjson when available (already compact
+            # and UTF-8 native), with a compact stdlib fallback.
+            temp_file.write_text(_dumps(data), encoding="utf-8")
+            os.replace(temp_file, session_file)
+        except Exception as e:
+            print(f"\nWarning: Failed to save session: {e}", file=sys.stderr)
+
+    try:
+        while True:
+            try:
+                # Get user input
+                user_input = input("\nYou: ").strip()
+
+                if not user_input:
+                    continue
+
+                command = user_input.lower()
+                if command in _EXIT_COMMANDS:
+                    print("Goodbye!")
+                    break
+
+                if command == "clear":
+                    engine.clear_history()
+                    print("Conversation history cleared.")
+                    continue
+
+                # Get response
+                print("\nAssistant: ", end="", flush=True)
+                response, stats = engine.chat(user_input)
+
+                # Print response (if not already printed during tool calls)
+                if response and False: # Disabled because chat() now streams to stdout
+                    print(response)
+
+                # Print stats
+                print(f"\n  [{stats.completion_tokens} tokens, {stats.tokens_per_second:.1f} tok/s, {stats.duration_seconds:.2f}s]")
+
+                # Save session if configured (in the background)
+                if saver is not None:
+                    if session_created_at is None:
+                        session_created_at = datetime.datetime.now().isoformat()
                     data = {
                         "version": 1,
-                        "created_at": datetime.datetime.now().isoformat(),
+                        "created_at": session_created_at,
                         "history": engine.get_history_as_dicts()
                     }
-                    # Atomic write
-                    temp_file = session_file.with_suffix(session_file.suffix + ".tmp")
-                    temp_file.write_text(json.dumps(data, indent=2), encoding="utf-8")
-                    os.replace(temp_file, session_file)
-                except Exception as e:
-                    print(f"\nWarning: Failed to save session: {e}", file=sys.stderr)
-            
-        except KeyboardInterrupt:
-            print("\n\nInterrupted. Goodbye!")
-            break
-        except EOFError:
-            print("\nGoodbye!")
-            break
+                    saver.submit(_save_session, data)
+
+                # Speculatively prefill the next turn's prompt while the
+                # user is typing; the KV cache makes it nearly free to
+                # re-evaluate once real input arrives.
+                threading.Thread(target=engine.prefill, daemon=True).start()
+
+            except KeyboardInterrupt:
+                print("\n\nInterrupted. Goodbye!")
+                break
+            except EOFError:
+                print("\nGoodbye!")
+                break
+    finally:
+        # Flush any in-flight save before exiting
+        if saver is not None:
+            saver.shutdown(wait=True)
@@ -5,11 +5,21 @@ import sys
 import json
 import os
 import datetime
+from functools import lru_cache
 from pathlib import Path
 
-from localchat.model import load_model
-from localchat.tools import ToolExecutor
-from localchat.chat import run_repl
+
+@lru_cache(maxsize=8)
+def _load_system_prompt(path_str: str, mtime_ns: int, size: int) -> str:
+    """
+    Read a system prompt file, cached by (path, mtime, size).
+
+    read_bytes + one decode skips the text layer's universal-newline
+    scan, and the stat-based key lets repeated loads in one process
+    (tests, embedding uses) skip the reread while still picking up
+    edits.
+    """
+    return Path(path_str).read_bytes().decode("utf-8")
 
 
 def parse_args() -> argparse.Namespace:
@@ -78,6 +88,12 @@ def parse_args() -> argparse.Namespace:
 def main() -> int:
     """Main entry point."""
     args = parse_args()
+
+    # Deferred so argparse (and --help/usage errors) never pay for the
+    # llama_cpp shared-library load these modules pull in.
+    from localchat.model import load_model
+    from localchat.tools import ToolExecutor
+    from localchat.chat import run_repl
     
     # Determine mode
     model_path = None
@@ -118,7 +134,10 @@ def main() -> int:
     if args.system:
         system_path = Path(args.system)
         if system_path.exists():
-            system_prompt = system_path.read_text()
+            st = system_path.stat()
+            system_prompt = _load_system_prompt(
+                str(system_path), st.st_mtime_ns, st.st_size
+            )
         else:
             print(f"Warning: System prompt file not found: {system_path}", 
                   file=sys.stderr)
@@ -1,17 +1,45 @@
 """Model loader with backend detection."""
 
+import os
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple, Any
 
-try:
-    from llama_cpp import Llama
-    import llama_cpp
-    LLAMA_AVAILABLE = True
-except ImportError:
-    LLAMA_AVAILABLE = False
-    Llama = Any  # type: ignore
+# llama_cpp is imported lazily: loading the shared library (and any CUDA
+# runtime init) is by far the most expensive import in the package, and
+# paying it before argparse even runs makes --help sluggish.
+
+
+@lru_cache(maxsize=16)
+def _list_gguf_files(repo_id: str) -> Tuple[str, ...]:
+    """
+    List .gguf files in a Hub repo, filtered server-side.
+
+    HfFileSystem.glob pushes the pattern into the Hub API instead of
+    fetching the full repo tree and filtering client-side; repos with
+    large quant families carry hundreds of non-GGUF files. Cached per
+    repo so repeat loads skip the network round trip entirely.
+    """
+    from huggingface_hub import HfFileSystem
+
+    fs = HfFileSystem()
+    return tuple(
+        p[len(repo_id) + 1:] for p in fs.glob(f"{repo_id}/**/*.gguf")
+    )
+
+
+def _import_llama_cpp() -> Any:
+    """Import llama_cpp on first use, or raise with an install hint."""
+    try:
+        import llama_cpp
+        return llama_cpp
+    except ImportError:
+        raise ImportError(
+            "llama-cpp-python is not installed. "
+            "Please install it using 'pip install llama-cpp-python' or run setup.sh."
+        )
 
 
 @dataclass
@@ -20,40 +48,67 @@ class RuntimeInfo:
     
     backend: str  # "cuda", "metal", "cpu"
     model_path: str
-    model_size_gb: float
     n_ctx: int
     n_gpu_layers: int
     repo_id: Optional[str] = None
     gpu_offload_supported: bool = False
-    
+    # Lazily computed by the model_size_gb property: headless consumers
+    # that never display() shouldn't pay a stat per load.
+    _model_size_gb: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def model_size_gb(self) -> float:
+        """Model file size in GiB, stat'ed on first access."""
+        if self._model_size_gb is None:
+            try:
+                self._model_size_gb = (
+                    Path(self.model_path).stat().st_size / (1024 ** 3)
+                )
+            except OSError:
+                self._model_size_gb = 0.0
+        return self._model_size_gb
+
     def display(self) -> None:
         """Print runtime information to stdout."""
-        print("=" * 50)
-        print("LocalChat - Runtime Information")
-        print("=" * 50)
-        
         backend_display = self.backend
         if self.backend == "cpu":
              backend_display += f" (gpu_offload_supported={self.gpu_offload_supported})"
-             
-        print(f"  Backend:      {backend_display}")
+
+        # One joined write instead of ten print calls (each a lock
+        # acquisition and, unbuffered, a syscall).
+        lines = [
+            "=" * 50,
+            "LocalChat - Runtime Information",
+            "=" * 50,
+            f"  Backend:      {backend_display}",
+        ]
         if self.repo_id:
-            print(f"  Repo ID:      {self.repo_id}")
-        print(f"  Model:        {self.model_path}")
-        print(f"  Model size:   {self.model_size_gb:.2f} GB")
-        print(f"  Context:      {self.n_ctx} tokens")
-        print(f"  GPU layers:   {self.n_gpu_layers}")
-        print("=" * 50)
+            lines.append(f"  Repo ID:      {self.repo_id}")
+        lines += [
+            f"  Model:        {self.model_path}",
+            f"  Model size:   {self.model_size_gb:.2f} GB",
+            f"  Context:      {self.n_ctx} tokens",
+            f"  GPU layers:   {self.n_gpu_layers}",
+            "=" * 50,
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
+@lru_cache(maxsize=1)
 def detect_backend() -> Tuple[str, int, bool]:
     """
     Detect available backend and return info.
-    
+
+    The probe is idempotent for the life of the process (build capability
+    and platform never change), so the result is cached and repeated
+    loads pay a dict lookup.
+
     Returns:
         Tuple of (backend_name, n_gpu_layers, gpu_offload_supported)
     """
-    if not LLAMA_AVAILABLE:
+    try:
+        llama_cpp = _import_llama_cpp()
+    except ImportError:
         return ("cpu", 0, False)
 
     # Check for GPU support in llama-cpp-python
@@ -75,12 +130,85 @@ def detect_backend() -> Tuple[str, int, bool]:
     return ("cpu", 0, False)
 
 
+# Tuning kwargs that only newer llama-cpp-python versions accept; dropped
+# on retry when the installed version rejects them.
+_OPTIONAL_TUNING_KEYS = ("flash_attn", "n_threads_batch", "n_ubatch")
+
+
+def _construct(factory: Any, *args: Any, **kwargs: Any) -> Any:
+    """
+    Call a Llama constructor, dropping unsupported tuning kwargs on retry.
+
+    Older llama-cpp-python versions raise TypeError for kwargs they don't
+    know; performance tuning must degrade gracefully rather than block
+    loading.
+    """
+    try:
+        return factory(*args, **kwargs)
+    except TypeError:
+        trimmed = {k: v for k, v in kwargs.items() if k not in _OPTIONAL_TUNING_KEYS}
+        if len(trimmed) == len(kwargs):
+            raise
+        return factory(*args, **trimmed)
+
+
+def _gpu_vram_ok(model_size_gb: float) -> bool:
+    """
+    Best-effort check that free VRAM can hold the model.
+
+    A doomed GPU load can take many seconds (partial mmap plus VRAM
+    allocation) before failing into the CPU retry, so when an NVML or
+    torch probe is available we commit to CPU up front instead. Answers
+    optimistically (True) when no probe is installed or the size is
+    unknown — the load-time fallback still catches real failures.
+    """
+    if model_size_gb <= 0:
+        return True
+    needed = model_size_gb * 1.1 * (1024 ** 3)
+    try:
+        import pynvml
+        pynvml.nvmlInit()
+        try:
+            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            return pynvml.nvmlDeviceGetMemoryInfo(handle).free >= needed
+        finally:
+            pynvml.nvmlShutdown()
+    except Exception:
+        pass
+    try:
+        import torch
+        if torch.cuda.is_available():
+            free, _ = torch.cuda.mem_get_info()
+            return free >= needed
+    except Exception:
+        pass
+    return True
+
+
+def _enable_prompt_cache(model: Any) -> None:
+    """
+    Attach a RAM-backed prompt cache to the model, if supported.
+
+    llama.cpp reuses the KV cache for the longest matching prompt prefix,
+    so in multi-turn (and tool-loop) conversations each generation only
+    evaluates the newly appended messages instead of the whole history.
+    Silently skipped on llama-cpp-python versions without cache support.
+    """
+    try:
+        from llama_cpp import LlamaRAMCache
+        model.set_cache(LlamaRAMCache())
+    except (ImportError, AttributeError, TypeError):
+        pass
+
+
 def load_model(
     model_path: Optional[Path] = None,
     repo_id: Optional[str] = None,
     filename: Optional[str] = None,
     n_ctx: int = 8192,
     n_gpu_layers: Optional[int] = None,
+    n_batch: int = 512,
+    n_ubatch: int = 512,
     verbose: bool = False,
 ) -> Tuple[Any, RuntimeInfo]:
     """
@@ -92,16 +220,15 @@ def load_model(
         filename: Filename in the repository (required if repo_id is provided)
         n_ctx: Context window size
         n_gpu_layers: Number of layers to offload to GPU (-1 for all, None for auto)
+        n_batch: Prompt-eval batch size (tokens per llama.cpp batch)
+        n_ubatch: Micro-batch size within a batch; raising it amortizes
+            kernel launches during prompt processing
         verbose: Whether to print loading progress
         
     Returns:
         Tuple of (Llama model instance, RuntimeInfo)
     """
-    if not LLAMA_AVAILABLE:
-        raise ImportError(
-            "llama-cpp-python is not installed. "
-            "Please install it using 'pip install llama-cpp-python' or run setup.sh."
-        )
+    Llama = _import_llama_cpp().Llama
 
     if not model_path and not repo_id:
         raise ValueError("Either model_path or repo_id must be provided")
@@ -124,11 +251,45 @@ def load_model(
         else:
              backend = "cpu"
     
-    # Common initialization args
+    # Skip a doomed GPU attempt when the model clearly won't fit in
+    # free VRAM (local files only; HF downloads have no size yet).
+    # Only full offload is probed: a partial n_gpu_layers puts just a
+    # fraction of the weights on-device, so the whole-file comparison
+    # would wrongly downgrade loads that fit.
+    if n_gpu_layers == -1 and backend == "cuda" and model_path:
+        try:
+            size_gb = float(model_path.stat().st_size) / (1024 ** 3)
+        except (OSError, TypeError, ValueError):
+            size_gb = 0.0
+        if not _gpu_vram_ok(size_gb):
+            print(
+                "Warning: model larger than free VRAM, loading on CPU",
+                file=sys.stderr,
+            )
+            backend = "cpu"
+            n_gpu_layers = 0
+
+    # Common initialization args. Decode throughput is memory-bound, so
+    # alongside GPU offload we pin a sensible CPU thread count (physical
+    # cores, roughly half the logical count) and enable FlashAttention
+    # where the installed llama-cpp-python supports it. offload_kqv keeps
+    # the KV cache (and its per-token attention GEMMs) on-device instead
+    # of bouncing over PCIe each layer; n_batch sizes prompt-eval batches
+    # and n_threads_batch lets batch processing use all logical cores.
     init_args = {
         "n_ctx": n_ctx,
         "n_gpu_layers": n_gpu_layers,
         "verbose": verbose,
+        "n_threads": max(1, (os.cpu_count() or 2) // 2),
+        "n_threads_batch": os.cpu_count() or 2,
+        "n_batch": n_batch,
+        "n_ubatch": n_ubatch,
+        "offload_kqv": True,
+        "flash_attn": True,
+        # Explicit mmap (no surprise if the library default changes) and
+        # no mlock: pinning multi-GB weights can evict more useful pages.
+        "use_mmap": True,
+        "use_mlock": False,
     }
 
     try:
@@ -136,12 +297,8 @@ def load_model(
             # Resolve filename if not provided
             if not filename:
                 try:
-                    from huggingface_hub import list_repo_files
-                    files = list_repo_files(repo_id=repo_id)
-                    # Simple heuristic: find first .gguf file
-                    # Ideally we might look for specific quantizations like q4_k_m, but first available is a safe start
-                    gguf_files = [f for f in files if f.endswith('.gguf')]
-                    
+                    gguf_files = _list_gguf_files(repo_id)
+
                     if not gguf_files:
                         raise ValueError(f"No .gguf files found in repository {repo_id}")
                     
@@ -167,21 +324,24 @@ def load_model(
             # If we rely on kwargs expansion **kwargs, we need 'filename' in there OR pass it explicitly.
             
             if filename:
-                model = Llama.from_pretrained(
+                model = _construct(
+                    Llama.from_pretrained,
                     repo_id,
                     filename,
                     **init_args
                 )
             else:
                  # If we still lack filename, this will likely fail again, but we can't do much more.
-                model = Llama.from_pretrained(
+                model = _construct(
+                    Llama.from_pretrained,
                     repo_id=repo_id,
                     **init_args
                 )
             model_path_str = model.model_path
         else:
             model_path_str = str(model_path)
-            model = Llama(
+            model = _construct(
+                Llama,
                 model_path=model_path_str,
                 **init_args
             )
@@ -202,35 +362,34 @@ def load_model(
             
             if repo_id:
                 if filename:
-                     model = Llama.from_pretrained(
+                     model = _construct(
+                        Llama.from_pretrained,
                         repo_id,
                         filename,
                         **init_args
                     )
                 else:
-                    model = Llama.from_pretrained(
+                    model = _construct(
+                        Llama.from_pretrained,
                         repo_id=repo_id,
                         **init_args
                     )
                 model_path_str = model.model_path
             else:
-                 model = Llama(
+                 model = _construct(
+                    Llama,
                     model_path=model_path_str,
                     **init_args
                 )
         else:
             raise
             
-    # Calculate model size
-    try:
-        model_size_gb = Path(model_path_str).stat().st_size / (1024 ** 3)
-    except Exception:
-        model_size_gb = 0.0
-    
+    # Reuse the KV cache across turns (prompt caching)
+    _enable_prompt_cache(model)
+
     runtime_info = RuntimeInfo(
         backend=backend,
         model_path=model_path_str,
-        model_size_gb=model_size_gb,
         n_ctx=n_ctx,
         n_gpu_layers=n_gpu_layers,
         repo_id=repo_id,
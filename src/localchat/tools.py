@@ -1,10 +1,29 @@
 """Tool definitions and implementations with sandbox security."""
 
 import json
+import os
+import stat
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Callable
 
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+# orjson parses the LLM-emitted argument blobs several times faster than
+# stdlib json on this hot dispatch path; fall back when not installed.
+try:
+    import orjson
+
+    def _loads(data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+    def _dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    _loads = json.loads
+
+    def _dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
 
 
 # =============================================================================
@@ -13,15 +32,30 @@ from pydantic import BaseModel, Field, ValidationError
 
 class ReadFileParams(BaseModel):
     """Parameters for read_file tool."""
+    model_config = {"frozen": True, "extra": "forbid"}
+
     path: str = Field(..., description="Path to the file to read (relative to workspace)")
 
 
 class WriteFileParams(BaseModel):
     """Parameters for write_file tool."""
+    model_config = {"frozen": True, "extra": "forbid"}
+
     path: str = Field(..., description="Path to the file to write (relative to workspace)")
     content: str = Field(..., description="Content to write to the file")
 
 
+# Precompiled validators: TypeAdapter builds its core-schema validator
+# once at import, so per-call validation skips the model-construction
+# overhead of Model(**args). frozen/extra=forbid above also let the
+# validator reject malformed calls outright instead of silently
+# dropping unknown keys.
+_PARAM_ADAPTERS: dict[type[BaseModel], TypeAdapter] = {
+    ReadFileParams: TypeAdapter(ReadFileParams),
+    WriteFileParams: TypeAdapter(WriteFileParams),
+}
+
+
 # =============================================================================
 # Sandbox Security
 # =============================================================================
@@ -31,6 +65,35 @@ class SandboxError(Exception):
     pass
 
 
+@lru_cache(maxsize=8)
+def _resolved_workspace(workspace: Path) -> tuple[Path, str, str]:
+    """
+    Resolve a workspace root once per process.
+
+    Every tool call re-resolved the workspace (several stat/readlink
+    syscalls); the root never moves at runtime, so cache the resolved
+    Path along with its string form and the prefix used for containment
+    checks.
+    """
+    resolved = workspace.resolve()
+    resolved_str = str(resolved)
+    return resolved, resolved_str, resolved_str + os.sep
+
+
+@lru_cache(maxsize=32)
+def _prepared_workspace(workspace: Path) -> Path:
+    """
+    Resolve and create a workspace root once per process.
+
+    Executor construction used to resolve + mkdir on every instance;
+    both are idempotent for a given root, so repeat constructions (test
+    suites, REPL restarts) skip the syscalls entirely.
+    """
+    resolved = _resolved_workspace(workspace)[0]
+    resolved.mkdir(parents=True, exist_ok=True)
+    return resolved
+
+
 def resolve_safe_path(workspace: Path, relative_path: str) -> Path:
     """
     Safely resolve a path within the workspace sandbox.
@@ -45,17 +108,27 @@ def resolve_safe_path(workspace: Path, relative_path: str) -> Path:
     Raises:
         SandboxError: If the path would escape the workspace
     """
-    # Normalize workspace to absolute path
-    workspace = workspace.resolve()
-    
+    # Normalize workspace to absolute path (cached per workspace)
+    workspace, workspace_str, workspace_prefix = _resolved_workspace(workspace)
+
+    # Cheap textual precheck: any ".." component is rejected before we
+    # spend syscalls resolving it. Note the final resolve() below is
+    # still required for paths that pass — string checks cannot catch
+    # symlinks inside the workspace that point outside it.
+    if ".." in relative_path.replace("\\", "/").split("/"):
+        raise SandboxError(
+            f"Access denied: '{relative_path}' is outside the workspace directory. "
+            f"Only files within '{workspace}' can be accessed."
+        )
+
     # Check for absolute paths that don't start with workspace
     if relative_path.startswith("/") or relative_path.startswith("\\"):
-        # Check if it's trying to access a path outside workspace
-        test_path = Path(relative_path).resolve()
-        try:
-            test_path.relative_to(workspace)
-            # It's within workspace, allow it
-        except ValueError:
+        # Check if it's trying to access a path outside workspace.
+        # A plain string-prefix comparison replaces the exception-driven
+        # relative_to() check; the path is already resolved, so the
+        # prefix test is exact.
+        test_str = str(Path(relative_path).resolve())
+        if test_str != workspace_str and not test_str.startswith(workspace_prefix):
             raise SandboxError(
                 f"Access denied: '{relative_path}' is outside the workspace directory. "
                 f"Only files within '{workspace}' can be accessed."
@@ -64,13 +137,13 @@ def resolve_safe_path(workspace: Path, relative_path: str) -> Path:
     # Clean the relative path (remove leading slashes for joining)
     clean_path = relative_path.lstrip("/").lstrip("\\")
     
-    # Resolve the full path
+    # Resolve the full path. The resolve() is load-bearing: it is what
+    # catches symlinks that point outside the workspace.
     target = (workspace / clean_path).resolve()
     
     # Security check: ensure target is within workspace
-    try:
-        target.relative_to(workspace)
-    except ValueError:
+    target_str = str(target)
+    if target_str != workspace_str and not target_str.startswith(workspace_prefix):
         raise SandboxError(
             f"Access denied: '{relative_path}' is outside the workspace directory. "
             f"Only files within '{workspace}' can be accessed."
@@ -83,6 +156,17 @@ def resolve_safe_path(workspace: Path, relative_path: str) -> Path:
 # Tool Implementations
 # =============================================================================
 
+# Only files up to this size are served from the read cache, bounding
+# its memory to ~128 MiB worst case.
+_READ_CACHE_MAX_BYTES = 1 << 20
+
+
+@lru_cache(maxsize=128)
+def _cached_read(path_str: str, mtime_ns: int, size: int) -> str:
+    """Read a file, keyed by its stat identity so edits invalidate."""
+    return Path(path_str).read_bytes().decode("utf-8")
+
+
 def read_file_impl(workspace: Path, params: ReadFileParams) -> str:
     """
     Read a file from the workspace.
@@ -95,13 +179,21 @@ def read_file_impl(workspace: Path, params: ReadFileParams) -> str:
         File content as string
     """
     target = resolve_safe_path(workspace, params.path)
-    
-    if not target.exists():
+
+    # One stat answers existence, type, and the cache key; the previous
+    # exists()/is_file()/read chain stat'ed three times.
+    try:
+        st = os.stat(target)
+    except FileNotFoundError:
         raise FileNotFoundError(f"File not found: {params.path}")
-    
-    if not target.is_file():
+
+    if not stat.S_ISREG(st.st_mode):
         raise IsADirectoryError(f"Path is a directory, not a file: {params.path}")
-    
+
+    # Agents re-read the same files within a session; hot files come
+    # from a stat-validated cache, large ones always hit disk.
+    if st.st_size <= _READ_CACHE_MAX_BYTES:
+        return _cached_read(str(target), st.st_mtime_ns, st.st_size)
     return target.read_text(encoding="utf-8")
 
 
@@ -118,13 +210,23 @@ def write_file_impl(workspace: Path, params: WriteFileParams) -> str:
     """
     target = resolve_safe_path(workspace, params.path)
     
-    # Create parent directories if needed
-    target.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Write the file
-    target.write_text(params.content, encoding="utf-8")
-    
-    return f"Successfully wrote {len(params.content)} characters to {params.path}"
+    # Create parent directories if needed; the isdir check keeps the
+    # common case (parent already exists) to one stat instead of the
+    # mkdir walk.
+    if not os.path.isdir(target.parent):
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+    # Encode once and write through raw os calls: open + one write +
+    # close, with none of the buffered-file machinery write_bytes pulls
+    # in. LLM turns often emit many small writes back to back.
+    encoded = params.content.encode("utf-8")
+    fd = os.open(str(target), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, encoded)
+    finally:
+        os.close(fd)
+
+    return f"Successfully wrote {len(encoded)} bytes to {params.path}"
 
 
 # =============================================================================
@@ -174,9 +276,42 @@ TOOL_DEFINITIONS = [
 ]
 
 
+# The definitions never change at runtime; serialize them once so
+# consumers that embed the schema in prompts or logs reuse the blob
+# instead of re-dumping the dicts per engine/turn.
+_TOOL_DEFINITIONS_JSON: bytes = _dumps_bytes(TOOL_DEFINITIONS)
+
+
+def _render_tool_prompt_fragment() -> str:
+    """Render the per-tool signature lines embedded in system prompts."""
+    lines = []
+    for tool_def in TOOL_DEFINITIONS:
+        func = tool_def["function"]
+        params = func["parameters"]["properties"]
+        param_strs = [f'{name}: {info["type"]}' for name, info in params.items()]
+        lines.append(
+            f"- {func['name']}({', '.join(param_strs)}): {func['description']}"
+        )
+    return "\n".join(lines)
+
+
+# Rendered once next to the definitions it describes; every executor and
+# engine shares the same string, so building a system prompt is a lookup.
+_TOOL_PROMPT_FRAGMENT = _render_tool_prompt_fragment()
+
+
+def get_tool_prompt_fragment() -> str:
+    """Get the pre-rendered tool list for system prompts."""
+    return _TOOL_PROMPT_FRAGMENT
+
+
 class ToolExecutor:
     """Executor for tools with validation and sandbox security."""
-    
+
+    # Fixed attribute set: slots keep instances small and make attribute
+    # access a direct offset load on the per-call dispatch path.
+    __slots__ = ("workspace", "_tools", "_dispatch", "_available_tools_str")
+
     def __init__(self, workspace: Path):
         """
         Initialize the tool executor.
@@ -184,16 +319,63 @@ class ToolExecutor:
         Args:
             workspace: The workspace root directory for file operations
         """
-        self.workspace = workspace.resolve()
-        
-        # Ensure workspace exists
-        self.workspace.mkdir(parents=True, exist_ok=True)
+        # Resolved + created via a process-wide cache keyed by path
+        self.workspace = _prepared_workspace(workspace)
         
         # Tool registry: name -> (param_model, implementation)
         self._tools: dict[str, tuple[type[BaseModel], Callable]] = {
             "read_file": (ReadFileParams, self._read_file),
             "write_file": (WriteFileParams, self._write_file),
         }
+
+        # Specialized dispatchers: validation and implementation are bound
+        # into one closure per tool at construction, so dispatch is a
+        # single dict lookup + call with no per-call registry unpacking.
+        self._dispatch: dict[str, Callable[[dict[str, Any]], str]] = {
+            name: self._make_dispatcher(param_model, impl)
+            for name, (param_model, impl) in self._tools.items()
+        }
+
+        # Pre-rendered for the unknown-tool error: the LLM retry loop
+        # can hit that path repeatedly during misfires.
+        self._available_tools_str = ", ".join(sorted(self._tools))
+
+    @staticmethod
+    def _make_dispatcher(
+        param_model: type[BaseModel], impl: Callable
+    ) -> Callable[[dict[str, Any]], str]:
+        """Bind a tool's validator and implementation into one callable."""
+        adapter = _PARAM_ADAPTERS.get(param_model) or TypeAdapter(param_model)
+        validate = adapter.validate_python
+
+        # Specialize for the shape every current tool has: a fixed set
+        # of required plain-str fields. A few type checks then replace
+        # full validation; anything that doesn't match exactly falls
+        # back to the TypeAdapter so error messages stay identical.
+        field_names = tuple(param_model.model_fields)
+        all_plain_str = all(
+            f.annotation is str and f.is_required()
+            for f in param_model.model_fields.values()
+        )
+        if all_plain_str:
+            n_fields = len(field_names)
+            construct = param_model.model_construct
+
+            def dispatch(arguments: dict[str, Any]) -> str:
+                if (
+                    type(arguments) is dict
+                    and len(arguments) == n_fields
+                    and all(
+                        type(arguments.get(name)) is str for name in field_names
+                    )
+                ):
+                    return impl(construct(**arguments))
+                return impl(validate(arguments))
+            return dispatch
+
+        def dispatch(arguments: dict[str, Any]) -> str:
+            return impl(validate(arguments))
+        return dispatch
     
     def _read_file(self, params: ReadFileParams) -> str:
         """Execute read_file tool."""
@@ -206,6 +388,14 @@ class ToolExecutor:
     def get_tool_definitions(self) -> list[dict]:
         """Get tool definitions for the LLM."""
         return TOOL_DEFINITIONS
+
+    def get_tool_definitions_json(self) -> bytes:
+        """Get the tool definitions as a pre-serialized JSON blob."""
+        return _TOOL_DEFINITIONS_JSON
+
+    def get_tool_prompt_fragment(self) -> str:
+        """Get the pre-rendered tool list for system prompts."""
+        return _TOOL_PROMPT_FRAGMENT
     
     def execute(self, tool_name: str, arguments: dict[str, Any] | str) -> str:
         """
@@ -221,33 +411,36 @@ class ToolExecutor:
         # Parse arguments if string
         if isinstance(arguments, str):
             try:
-                arguments = json.loads(arguments)
-            except json.JSONDecodeError as e:
+                arguments = _loads(arguments)
+            except ValueError as e:
+                # Covers both json.JSONDecodeError and orjson.JSONDecodeError
                 return f"Error: Invalid JSON arguments: {e}"
         
-        # Check if tool exists
-        if tool_name not in self._tools:
-            return f"Error: Unknown tool '{tool_name}'. Available tools: {list(self._tools.keys())}"
-        
-        param_model, impl = self._tools[tool_name]
-        
-        # Validate arguments
+        # Look up the specialized dispatcher for this tool
+        dispatch = self._dispatch.get(tool_name)
+        if dispatch is None:
+            return f"Error: Unknown tool '{tool_name}'. Available tools: {self._available_tools_str}"
+
+        # Validate and execute in one call
         try:
-            params = param_model(**arguments)
+            return dispatch(arguments)
         except ValidationError as e:
+            # e.errors() re-derives from pydantic internals; call it once.
             errors = e.errors()
-            error_msgs = [f"{err['loc'][0]}: {err['msg']}" for err in errors]
-            return f"Error: Invalid arguments: {'; '.join(error_msgs)}"
-        
-        # Execute the tool
-        try:
-            result = impl(params)
-            return result
-        except SandboxError as e:
-            return f"Error: {e}"
-        except FileNotFoundError as e:
-            return f"Error: {e}"
-        except IsADirectoryError as e:
+            # loc is empty when the whole payload is the wrong shape
+            # (e.g. a JSON list or string instead of an object).
+            if len(errors) == 1:
+                err = errors[0]
+                loc = err["loc"][0] if err["loc"] else "arguments"
+                return f"Error: Invalid arguments: {loc}: {err['msg']}"
+            joined = "; ".join(
+                f"{err['loc'][0] if err['loc'] else 'arguments'}: {err['msg']}"
+                for err in errors
+            )
+            return f"Error: Invalid arguments: {joined}"
+        except (SandboxError, FileNotFoundError, IsADirectoryError) as e:
+            # One handler for the clauses that share a message shape
+            # keeps the exception table short on this per-call path.
             return f"Error: {e}"
         except PermissionError as e:
             return f"Error: Permission denied: {e}"
@@ -5,7 +5,14 @@ from unittest.mock import Mock, MagicMock
 from pathlib import Path
 import tempfile
 
-from localchat.chat import ChatEngine, ToolCall, Message, GenerationStats
+from localchat.chat import (
+    ChatEngine,
+    ToolCall,
+    Message,
+    GenerationStats,
+    LLMResponseCache,
+    SemanticCache,
+)
 
 
 @pytest.fixture
@@ -181,6 +188,156 @@ class TestChatEngine:
         assert "Hello from file" in response
         assert stats.completion_tokens == 20  # Accumulated from both calls
     
+    def test_chat_with_parallel_tool_calls(self, mock_model, tool_executor, temp_workspace):
+        """Test that multiple tool calls in one turn keep their order."""
+        (temp_workspace / "a.txt").write_text("Content A")
+        (temp_workspace / "b.txt").write_text("Content B")
+
+        mock_model.create_chat_completion = Mock(side_effect=[
+            {
+                "choices": [{"message": {"content": '''```tool_call
+{"name": "read_file", "arguments": {"path": "a.txt"}}
+```
+```tool_call
+{"name": "read_file", "arguments": {"path": "b.txt"}}
+```'''}}],
+                "usage": {"total_tokens": 30, "prompt_tokens": 20, "completion_tokens": 10}
+            },
+            {
+                "choices": [{"message": {"content": "Both files read."}}],
+                "usage": {"total_tokens": 40, "prompt_tokens": 30, "completion_tokens": 10}
+            },
+        ])
+
+        engine = ChatEngine(
+            model=mock_model,
+            tool_executor=tool_executor,
+        )
+
+        response, stats = engine.chat("Read both files")
+
+        assert "Both files read" in response
+        tool_messages = [m for m in engine.history if m.role == "tool"]
+        assert [m.content for m in tool_messages] == ["Content A", "Content B"]
+
+    def test_chat_batch_isolated_histories(self, mock_model, tool_executor):
+        """Test that batch inputs don't leak into each other or the engine."""
+        mock_model.create_chat_completion = Mock(side_effect=[
+            {
+                "choices": [{"message": {"content": "Answer one"}}],
+                "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+            },
+            {
+                "choices": [{"message": {"content": "Answer two"}}],
+                "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+            },
+        ])
+
+        engine = ChatEngine(
+            model=mock_model,
+            tool_executor=tool_executor,
+        )
+
+        results = engine.chat_batch(["Question one", "Question two"])
+
+        assert [r for r, _ in results] == ["Answer one", "Answer two"]
+        # Engine history restored to its pre-batch state
+        assert len(engine.history) == 0
+
+        # The second call must not have seen the first exchange
+        second_messages = mock_model.create_chat_completion.call_args_list[1].kwargs["messages"]
+        assert all("Question one" not in m["content"] for m in second_messages)
+
+    def test_history_pruning_with_archive(self, mock_model, tool_executor, temp_workspace):
+        """Test that old messages are evicted to the archive between turns."""
+        import json as json_module
+
+        mock_model.create_chat_completion = Mock(return_value={
+            "choices": [{"message": {"content": "Reply"}}],
+            "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+        })
+
+        archive = temp_workspace / "archive.jsonl"
+        engine = ChatEngine(
+            model=mock_model,
+            tool_executor=tool_executor,
+            max_history_messages=2,
+            history_archive=archive,
+        )
+
+        engine.chat("First question")
+        engine.chat("Second question")
+        engine.chat("Third question")
+
+        # Bounded in memory: at most cap + messages from the current turn
+        assert len(engine.history) == 4
+
+        archived = [
+            json_module.loads(line)
+            for line in archive.read_text().splitlines()
+        ]
+        assert archived[0]["content"] == "First question"
+        assert archived[1]["content"] == "Reply"
+
+    def test_sliding_window_context_truncation(self, mock_model, tool_executor):
+        """Test that the prompt keeps sinks + recent tail but full history stays."""
+        mock_model.create_chat_completion = Mock(return_value={
+            "choices": [{"message": {"content": "Reply"}}],
+            "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+        })
+
+        engine = ChatEngine(
+            model=mock_model,
+            tool_executor=tool_executor,
+            max_context_messages=3,
+            sink_messages=2,
+        )
+
+        engine.chat("First question")
+        engine.chat("Second question")
+        engine.chat("Third question")
+
+        messages = mock_model.create_chat_completion.call_args.kwargs["messages"]
+        # System + 2 sinks + 1 most recent message
+        assert len(messages) == 4
+        assert messages[0]["role"] == "system"
+        assert messages[1]["content"] == "First question"
+        assert messages[2]["content"] == "Reply"
+        assert messages[3]["content"] == "Third question"
+
+        # Truncation is prompt-only: nothing was evicted from memory
+        assert len(engine.history) == 6
+
+    def test_chat_streaming_with_tool_call(self, mock_model, tool_executor, temp_workspace, capsys):
+        """Test the streaming path: partial markers, suppression, tool loop."""
+        (temp_workspace / "test.txt").write_text("Hello from file!")
+
+        def chunked(text, size=3):
+            for i in range(0, len(text), size):
+                yield {"choices": [{"delta": {"content": text[i:i + size]}}]}
+
+        first = ('Reading it now.\n```tool_call\n'
+                 '{"name": "read_file", "arguments": {"path": "test.txt"}}\n```')
+        second = "The file says: Hello from file!"
+        mock_model.create_chat_completion = Mock(side_effect=[
+            chunked(first),
+            chunked(second),
+        ])
+
+        engine = ChatEngine(
+            model=mock_model,
+            tool_executor=tool_executor,
+        )
+
+        response, stats = engine.chat("Read test.txt")
+
+        assert response == second
+        captured = capsys.readouterr().out
+        # Visible text streamed; the tool_call block itself was suppressed
+        assert "Reading it now." in captured
+        assert '"name": "read_file"' not in captured.replace("TOOL CALL", "")
+        assert "Hello from file!" in captured
+
     def test_clear_history(self, mock_model, tool_executor):
         """Test clearing conversation history."""
         engine = ChatEngine(
@@ -198,9 +355,179 @@ class TestChatEngine:
         assert len(engine.history) == 0
 
 
+class TestLLMResponseCache:
+    """Tests for the exact-match response cache."""
+
+    def test_put_get_roundtrip(self, temp_workspace):
+        """Test storing and retrieving a cached response."""
+        cache = LLMResponseCache(db_path=temp_workspace / "cache.db")
+
+        key = LLMResponseCache.make_key(
+            [{"role": "user", "content": "hi"}], 0.0, 100
+        )
+        assert cache.get(key) is None
+
+        cache.put(key, "Hello!", 5)
+        assert cache.get(key) == ("Hello!", 5)
+
+        cache.close()
+
+    def test_key_depends_on_messages_and_params(self):
+        """Test that different inputs produce different keys."""
+        messages = [{"role": "user", "content": "hi"}]
+        key = LLMResponseCache.make_key(messages, 0.0, 100)
+
+        assert LLMResponseCache.make_key(messages, 0.5, 100) != key
+        assert LLMResponseCache.make_key(messages, 0.0, 200) != key
+        assert LLMResponseCache.make_key(
+            [{"role": "user", "content": "bye"}], 0.0, 100
+        ) != key
+
+    def test_engine_skips_model_on_cache_hit(self, mock_model, tool_executor, temp_workspace):
+        """Test that a repeated deterministic prompt doesn't re-invoke the model."""
+        mock_model.create_chat_completion = Mock(return_value={
+            "choices": [{"message": {"content": "Cached answer"}}],
+            "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+        })
+
+        cache = LLMResponseCache(db_path=temp_workspace / "cache.db")
+
+        def make_engine():
+            return ChatEngine(
+                model=mock_model,
+                tool_executor=tool_executor,
+                temperature=0.0,
+                response_cache=cache,
+            )
+
+        response1, _ = make_engine().chat("Hi there!")
+        assert mock_model.create_chat_completion.call_count == 1
+
+        # Fresh engine, identical conversation state: served from cache
+        response2, _ = make_engine().chat("Hi there!")
+        assert mock_model.create_chat_completion.call_count == 1
+        assert response2 == response1
+
+        cache.close()
+
+    def test_engine_bypasses_cache_when_sampling(self, mock_model, tool_executor, temp_workspace):
+        """Test that nonzero temperature never reads or writes the cache."""
+        mock_model.create_chat_completion = Mock(return_value={
+            "choices": [{"message": {"content": "Stochastic answer"}}],
+            "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+        })
+
+        cache = LLMResponseCache(db_path=temp_workspace / "cache.db")
+
+        for _ in range(2):
+            engine = ChatEngine(
+                model=mock_model,
+                tool_executor=tool_executor,
+                temperature=0.7,
+                response_cache=cache,
+            )
+            engine.chat("Hi there!")
+
+        assert mock_model.create_chat_completion.call_count == 2
+        cache.close()
+
+
+class TestSemanticCache:
+    """Tests for the semantic cache over user turns."""
+
+    @staticmethod
+    def _embed(text):
+        """Toy embedder: paraphrases of 'hello' map to the same direction."""
+        if "hello" in text.lower() or "hi" in text.lower():
+            return [1.0, 0.0]
+        return [0.0, 1.0]
+
+    def test_lookup_hit_on_paraphrase(self):
+        """Test that a semantically similar input returns the cached response."""
+        cache = SemanticCache(embed_fn=self._embed)
+        cache.add("hello there", "Hi! How can I help?", "h1")
+
+        assert cache.lookup("hi!", "h1") == "Hi! How can I help?"
+
+    def test_lookup_miss_on_different_input(self):
+        """Test that a dissimilar input misses the cache."""
+        cache = SemanticCache(embed_fn=self._embed)
+        cache.add("hello there", "Hi! How can I help?", "h1")
+
+        assert cache.lookup("what is the weather", "h1") is None
+
+    def test_lookup_scoped_by_history(self):
+        """Test that entries from a different conversation state never hit."""
+        cache = SemanticCache(embed_fn=self._embed)
+        cache.add("hello there", "Hi! How can I help?", "h1")
+
+        assert cache.lookup("hello there", "other-history") is None
+
+    def test_exact_repeat_skips_embedding(self):
+        """Test that a literal repeat hits without re-embedding the input."""
+        calls = []
+
+        def embed(text):
+            calls.append(text)
+            return self._embed(text)
+
+        cache = SemanticCache(embed_fn=embed)
+        cache.add("hello there", "Hi! How can I help?", "h1")
+        embed_count = len(calls)
+
+        assert cache.lookup("  Hello There ", "h1") == "Hi! How can I help?"
+        assert len(calls) == embed_count
+
+    def test_engine_skips_model_on_semantic_hit(self, mock_model, tool_executor):
+        """Test that a paraphrased user turn doesn't re-invoke the model."""
+        mock_model.create_chat_completion = Mock(return_value={
+            "choices": [{"message": {"content": "Hi! How can I help?"}}],
+            "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+        })
+
+        def make_engine():
+            return ChatEngine(
+                model=mock_model,
+                tool_executor=tool_executor,
+                semantic_cache=cache,
+            )
+
+        cache = SemanticCache(embed_fn=self._embed)
+
+        make_engine().chat("hello there")
+        assert mock_model.create_chat_completion.call_count == 1
+
+        response, stats = make_engine().chat("hi!")
+        assert mock_model.create_chat_completion.call_count == 1
+        assert response == "Hi! How can I help?"
+        assert stats.completion_tokens == 0
+
+
+class TestSessionSummary:
+    """Tests for per-session stats summarization."""
+
+    def test_summarize_session(self, mock_model, tool_executor):
+        """Test that per-turn stats reduce to session totals."""
+        mock_model.create_chat_completion = Mock(return_value={
+            "choices": [{"message": {"content": "Reply"}}],
+            "usage": {"total_tokens": 20, "prompt_tokens": 10, "completion_tokens": 10}
+        })
+        engine = ChatEngine(model=mock_model, tool_executor=tool_executor)
+
+        assert engine.summarize_session()["turns"] == 0
+
+        engine.chat("First question")
+        engine.chat("Second question")
+
+        summary = engine.summarize_session()
+        assert summary["turns"] == 2
+        assert summary["total_completion_tokens"] == 20
+        assert summary["tokens_per_second"] >= 0.0
+
+
 class TestGenerationStats:
     """Tests for GenerationStats."""
-    
+
     def test_tokens_per_second(self):
         """Test tokens per second calculation."""
         stats = GenerationStats(
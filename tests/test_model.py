@@ -78,9 +78,10 @@ def test_load_model_hf_auto_filename(model_module):
     mock_instance = model_module._mock_llama.from_pretrained.return_value
     mock_instance.model_path = "/cache/auto_model.gguf"
     
-    # Mock list_repo_files
-    model_module._mock_hv_hub.list_repo_files.return_value = ["model.json", "model_q4_0.gguf", "model_q8.gguf"]
-    
+    # Mock HfFileSystem.glob (server-side .gguf filter)
+    mock_fs = model_module._mock_hv_hub.HfFileSystem.return_value
+    mock_fs.glob.return_value = ["test/repo/model_q4_0.gguf", "test/repo/model_q8.gguf"]
+
     with patch.object(Path, "stat") as mock_stat:
         mock_stat.return_value.st_size = 1024**3
         
@@ -90,8 +91,8 @@ def test_load_model_hf_auto_filename(model_module):
         )
         
         # Should have detected model_q4_0.gguf
-        model_module._mock_hv_hub.list_repo_files.assert_called_with(repo_id="test/repo")
-        
+        mock_fs.glob.assert_called_with("test/repo/**/*.gguf")
+
         args, kwargs = model_module._mock_llama.from_pretrained.call_args
         assert args[0] == "test/repo"
         assert args[1] == "model_q4_0.gguf" # Should pick the one we prioritized or first one
@@ -169,6 +169,13 @@ class TestToolExecutor:
         result = executor.execute("read_file", "not valid json")
         assert "Error:" in result
         assert "Invalid JSON" in result
+
+    def test_non_object_arguments(self, executor):
+        """Test that non-dict JSON arguments return an error string."""
+        for payload in ('[1, 2]', '"hello"', '42'):
+            result = executor.execute("read_file", payload)
+            assert "Error:" in result
+            assert "Invalid arguments" in result
     
     def test_get_tool_definitions(self, executor):
         """Test that tool definitions are returned correctly."""